@@ -0,0 +1,203 @@
+import argparse
+import configparser
+import logging
+import os
+import sys
+import time
+import etl_pipeline
+from etl_pipeline import DEFAULT_CONFIG_FILE, DEFAULT_LOG_FILE, setup_logging
+from etl_config import load_pipeline_config, select_sources
+from etl_inputs import CODECS, codec_summary, reset_codec_stats, write_compressed
+
+# Command line entry point: `etl run|schedule|validate|bench`.
+# Heavy dependencies (pandas, SQLAlchemy, schedule) are only imported by the
+# subcommands that actually need them.
+
+DB_KEYS = ('user', 'password', 'host', 'port', 'database')
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def cmd_run(args):
+    # Run the pipeline once and exit
+    etl_pipeline.run_pipeline(args.config, args.source)
+    return 0
+
+
+def cmd_schedule(args):
+    # Run the pipeline daily until interrupted
+    from etl_scheduler import start_scheduler
+
+    start_scheduler(args.config, args.at)
+    return 0
+
+
+def validate_config(config_file):
+    # Return a list of problems with the configuration and input files
+    problems = []
+    if not os.path.exists(config_file):
+        return [f"Config file not found: {config_file}"]
+
+    config = configparser.ConfigParser()
+    config.read(config_file)
+    if not config.has_section('postgresql'):
+        problems.append("Missing [postgresql] section")
+    else:
+        for key in DB_KEYS:
+            if not config.has_option('postgresql', key):
+                problems.append(f"Missing '{key}' in [postgresql]")
+
+    try:
+        pipeline_config = load_pipeline_config(config_file)
+    except ValueError as e:
+        return problems + [str(e)]
+
+    if not pipeline_config.sources:
+        problems.append("No [source:*] sections defined")
+    for source in pipeline_config.sources:
+        if source.transform not in etl_pipeline.TRANSFORMS:
+            problems.append(f"Unknown transform '{source.transform}' for source '{source.name}'")
+        if not source.files():
+            problems.append(f"No input files match {source.path} for source '{source.name}'")
+    return problems
+
+
+def cmd_validate(args):
+    problems = validate_config(args.config)
+    for problem in problems:
+        logging.error(problem)
+    if problems:
+        return 1
+    logging.info(f"Configuration {args.config} is valid.")
+    return 0
+
+
+def _time_subprocess(code, repeat):
+    # Time a fresh interpreter running `code`; returns (wall times, in-process times)
+    import subprocess
+
+    wall_times, import_times = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-c', code], cwd=MODULE_DIR,
+            capture_output=True, text=True
+        )
+        wall_times.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            return None, None
+        import_times.append(float(result.stdout.strip().splitlines()[-1]))
+    return wall_times, import_times
+
+
+def measure_import_time(modules, repeat=5):
+    # Median cold import time of `modules` and of the whole interpreter start-up
+    import statistics
+
+    code = ("import time; start = time.perf_counter(); "
+            f"import {', '.join(modules)}; "
+            "print(time.perf_counter() - start)")
+    wall_times, import_times = _time_subprocess(code, repeat)
+    if wall_times is None:
+        return None
+    return {
+        'import': statistics.median(import_times),
+        'startup': statistics.median(wall_times),
+    }
+
+
+def bench_codecs(args):
+    # Extract each source's first file plain and re-compressed with every codec
+    import tempfile
+
+    sources = select_sources(load_pipeline_config(args.config).sources, args.source)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for source in sources:
+            files = source.files()
+            if not files:
+                continue
+            reset_codec_stats()
+            inputs = [files[0]]
+            for codec in CODECS:
+                try:
+                    inputs.append(write_compressed(files[0], tmp_dir, codec))
+                except ImportError as e:
+                    logging.warning(f"[bench] skipping {codec}: {e}")
+            for file_path in inputs:
+                etl_pipeline.extract_data(file_path, columns=source.columns, dtype=source.dtypes)
+            logging.info(f"[bench] codecs for {source.name} ({os.path.basename(files[0])}):")
+            for line in codec_summary():
+                logging.info(line)
+
+
+def cmd_bench(args):
+    # Measure start-up cost and, optionally, extract/transform stage timings
+    targets = [
+        ('etl_cli, etl_pipeline, etl_scheduler', ['etl_cli', 'etl_pipeline', 'etl_scheduler']),
+        ('pandas, sqlalchemy (deferred)', ['pandas', 'sqlalchemy']),
+    ]
+    for label, modules in targets:
+        timing = measure_import_time(modules, args.repeat)
+        if timing is None:
+            logging.warning(f"[bench] import {label}: not available")
+            continue
+        logging.info(f"[bench] import {label}: {timing['import'] * 1000:.1f} ms "
+                     f"(process start-up {timing['startup'] * 1000:.1f} ms, median of {args.repeat})")
+
+    if args.codecs:
+        bench_codecs(args)
+
+    if args.stages:
+        reset_codec_stats()
+        sources = select_sources(load_pipeline_config(args.config).sources, args.source)
+        for source in sources:
+            for file_path in source.files():
+                start = time.perf_counter()
+                data = etl_pipeline.extract_data(file_path, columns=source.columns, dtype=source.dtypes,
+                                                 compression=source.compression)
+                extracted = time.perf_counter()
+                etl_pipeline.transform_table(source.transform, data)
+                transformed = time.perf_counter()
+                logging.info(f"[bench] {source.name} {os.path.basename(file_path)}: "
+                             f"extract {(extracted - start) * 1000:.1f} ms, "
+                             f"transform {(transformed - extracted) * 1000:.1f} ms")
+        for line in codec_summary():
+            logging.info(line)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='etl', description='RetailPro ETL pipeline')
+    parser.add_argument('--config', default=DEFAULT_CONFIG_FILE,
+                        help='path to config.ini (default: %(default)s)')
+    parser.add_argument('--log-file', default=DEFAULT_LOG_FILE,
+                        help="log file, or '' to log to the console only (default: %(default)s)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='run the pipeline once')
+    run_parser.add_argument('--source', action='append', help='only run this source (repeatable)')
+    run_parser.set_defaults(func=cmd_run)
+
+    schedule_parser = subparsers.add_parser('schedule', help='run the pipeline daily')
+    schedule_parser.add_argument('--at', help="run every source at this time of day instead of its configured schedule")
+    schedule_parser.set_defaults(func=cmd_schedule)
+
+    validate_parser = subparsers.add_parser('validate', help='check configuration and input files')
+    validate_parser.set_defaults(func=cmd_validate)
+
+    bench_parser = subparsers.add_parser('bench', help='measure start-up and stage timings')
+    bench_parser.add_argument('--repeat', type=int, default=5, help='cold imports to time (default: %(default)s)')
+    bench_parser.add_argument('--stages', action='store_true', help='also time extract and transform on the input files')
+    bench_parser.add_argument('--codecs', action='store_true', help='compare extract throughput and CPU per compression codec')
+    bench_parser.add_argument('--source', action='append', help='only time this source with --stages/--codecs (repeatable)')
+    bench_parser.set_defaults(func=cmd_bench)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    setup_logging(args.log_file)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
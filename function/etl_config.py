@@ -0,0 +1,139 @@
+import configparser
+import glob
+import os
+from dataclasses import dataclass, field
+from etl_inputs import CODECS, is_remote
+
+# Pipeline sources are declared in config.ini, one [source:<name>] section each:
+#
+#   [source:branch_sales_north]
+#   path = /srv/feeds/north/branch_sales_*.csv
+#   table = branch_sales
+#   transform = branch_sales
+#   columns = transaction_id, timestamp, quantity
+#   dtypes = item_id:int64, price:float64
+#   compression = infer
+#   schedule = 06:00
+#
+# `path` is a file or glob, relative to config.ini, or a URL; every matching
+# file is processed as a separate shard into `table`. `transform` names an
+# entry of etl_pipeline.TRANSFORMS. `columns` (required columns), `dtypes`
+# (read_csv dtypes), `compression` (infer, none, gzip, bz2, zstd or zip) and
+# `schedule` (daily run time) are optional; the defaults for `schedule` and the
+# shard pool size come from the [pipeline] section, which also sets the run
+# manifest directory and whether lineage columns are added (see etl_manifest.py).
+
+SOURCE_PREFIX = 'source:'
+DEFAULT_SCHEDULE = '18:30'
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_MANIFEST_DIR = 'manifests'
+
+
+@dataclass
+class SourceConfig:
+    name: str
+    path: str
+    table: str
+    transform: str
+    columns: list = field(default_factory=list)
+    dtypes: dict = field(default_factory=dict)
+    compression: str = 'infer'
+    schedule: str = DEFAULT_SCHEDULE
+
+    def files(self):
+        # All files matching the source path, in a stable order
+        if is_remote(self.path):
+            return [self.path]
+        return sorted(glob.glob(self.path))
+
+
+@dataclass
+class PipelineConfig:
+    sources: list
+    max_workers: int = DEFAULT_MAX_WORKERS
+    schedule: str = DEFAULT_SCHEDULE
+    manifest_dir: str = DEFAULT_MANIFEST_DIR
+    lineage_columns: bool = False
+
+
+def _split_list(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def _parse_dtypes(value, section):
+    dtypes = {}
+    for item in _split_list(value):
+        column, sep, dtype = item.partition(':')
+        if not sep or not column.strip() or not dtype.strip():
+            raise ValueError(f"Invalid dtype '{item}' in [{section}], expected column:dtype")
+        dtypes[column.strip()] = dtype.strip()
+    return dtypes
+
+
+def load_pipeline_config(config_file):
+    # Read the [pipeline] defaults and every [source:*] section from config_file
+    if not os.path.exists(config_file):
+        raise FileNotFoundError(f"Config file not found: {config_file}")
+
+    config = configparser.ConfigParser()
+    config.read(config_file)
+    base_dir = os.path.dirname(os.path.abspath(config_file))
+
+    schedule = config.get('pipeline', 'schedule', fallback=DEFAULT_SCHEDULE)
+    max_workers = config.getint('pipeline', 'max_workers', fallback=DEFAULT_MAX_WORKERS)
+    manifest_dir = config.get('pipeline', 'manifest_dir', fallback=DEFAULT_MANIFEST_DIR)
+    lineage_columns = config.getboolean('pipeline', 'lineage_columns', fallback=False)
+
+    sources = []
+    for section in config.sections():
+        if not section.startswith(SOURCE_PREFIX):
+            continue
+        name = section[len(SOURCE_PREFIX):].strip()
+        for key in ('path', 'table', 'transform'):
+            if not config.has_option(section, key):
+                raise ValueError(f"Missing '{key}' in [{section}]")
+
+        path = config.get(section, 'path')
+        if not is_remote(path):
+            path = os.path.join(base_dir, os.path.expanduser(path))
+
+        compression = config.get(section, 'compression', fallback='infer').lower()
+        if compression not in ('infer', 'none') + CODECS:
+            raise ValueError(f"Invalid compression '{compression}' in [{section}]")
+
+        sources.append(SourceConfig(
+            name=name,
+            path=path,
+            table=config.get(section, 'table'),
+            transform=config.get(section, 'transform'),
+            columns=_split_list(config.get(section, 'columns', fallback='')),
+            dtypes=_parse_dtypes(config.get(section, 'dtypes', fallback=''), section),
+            compression=compression,
+            schedule=config.get(section, 'schedule', fallback=schedule),
+        ))
+
+    return PipelineConfig(
+        sources=sources,
+        max_workers=max_workers,
+        schedule=schedule,
+        manifest_dir=os.path.join(base_dir, os.path.expanduser(manifest_dir)),
+        lineage_columns=lineage_columns,
+    )
+
+
+def sources_by_table(sources):
+    # Names of the sources loading into each target table, in config order
+    tables = {}
+    for source in sources:
+        tables.setdefault(source.table, []).append(source.name)
+    return tables
+
+
+def select_sources(sources, names=None):
+    # Restrict sources to the given names, keeping config order
+    if not names:
+        return list(sources)
+    unknown = set(names) - {source.name for source in sources}
+    if unknown:
+        raise ValueError(f"Unknown source(s): {', '.join(sorted(unknown))}")
+    return [source for source in sources if source.name in names]
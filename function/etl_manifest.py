@@ -0,0 +1,226 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+from datetime import datetime
+from etl_inputs import is_remote
+
+# Every run writes <manifest_dir>/<run_id>.json describing, per target table,
+# the batches it loaded. A batch is one input file (shard) of a source and
+# records the file's size and sha256 (hashed while it is extracted), rows
+# in/out of the transform, rows dropped by deduplication, an order-independent
+# checksum of the transformed rows and whether it was loaded. Loaded row counts are checked against the DB
+# after the run. With `lineage_columns = true` in [pipeline], loaded rows also
+# carry compact `run_id` / `batch_id` columns (indexed), so one batch can be
+# re-verified or deleted without scanning the whole table.
+#
+# Tables fed by more than one source carry a `source` column, so a run of only
+# some of those sources replaces just their rows (delete, then append, in the
+# run's load transaction) and leaves the other feeds' rows alone.
+
+SOURCE_COLUMN = 'source'
+LINEAGE_COLUMNS = {'run_id': 'BIGINT', 'batch_id': 'INTEGER'}
+
+_run_id_lock = threading.Lock()
+_last_run_id = 0
+
+
+def new_run_id():
+    # Sortable run id that fits a BIGINT column: millisecond timestamp plus two
+    # random digits, e.g. 2026101918300012345. Ids increase within a process and
+    # the random digits keep concurrent processes apart; the manifest is created
+    # exclusively, so a clash fails loudly instead of overwriting a manifest.
+    global _last_run_id
+    run_id = int(datetime.now().strftime('%Y%m%d%H%M%S%f')[:-3]) * 100 + random.randrange(100)
+    with _run_id_lock:
+        _last_run_id = max(run_id, _last_run_id + 1)
+        return _last_run_id
+
+
+def file_fingerprint(path, block_size=1 << 20):
+    # Size and sha256 of a local input file; remote inputs are not re-fetched
+    if is_remote(path) or not os.path.isfile(path):
+        return {'size': None, 'sha256': None}
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return {'size': os.path.getsize(path), 'sha256': digest.hexdigest()}
+
+
+def batch_checksum(data):
+    # Order-independent checksum of a DataFrame: sum of vectorised row hashes modulo 2**64
+    import pandas as pd
+
+    row_hashes = pd.util.hash_pandas_object(data, index=False).to_numpy()
+    return f"{int(row_hashes.sum(dtype='uint64')):016x}"
+
+
+def add_lineage_columns(data, run_id, batch_id):
+    # Tag every row with the run and batch that loaded it
+    return data.assign(run_id=run_id, batch_id=batch_id)
+
+
+def describe_batch(source, file_path, batch_id, rows_in, data, fingerprint=None):
+    # Manifest entry for one transformed shard; `fingerprint` is the size/sha256
+    # taken while extracting, the file is only re-read when it is missing
+    return {
+        'batch_id': batch_id,
+        'source': source.name,
+        'file': file_path,
+        **(fingerprint or file_fingerprint(file_path)),
+        'rows_in': rows_in,
+        'rows_out': len(data),
+        'dropped_duplicates': rows_in - len(data),
+        'checksum': batch_checksum(data),
+        'loaded': False,
+    }
+
+
+def failed_batch(source, file_path, batch_id, error):
+    # Manifest entry for a shard that could not be extracted or transformed
+    return {
+        'batch_id': batch_id,
+        'source': source.name,
+        'file': file_path,
+        **file_fingerprint(file_path),
+        'rows_in': 0,
+        'rows_out': 0,
+        'dropped_duplicates': 0,
+        'checksum': None,
+        'loaded': False,
+        'error': str(error),
+    }
+
+
+def add_source_column(data, source_name):
+    # Tag every row with the source that loaded it (tables shared by several sources only)
+    return data.assign(**{SOURCE_COLUMN: source_name})
+
+
+def add_missing_columns(conn, table, columns):
+    # Add the `columns` ({name: SQL type}) an existing table lacks, so rows with
+    # new tag columns can be appended to it; returns the names of added columns
+    from sqlalchemy import inspect, text
+
+    inspector = inspect(conn)
+    if not inspector.has_table(table):
+        return []
+    existing = {column['name'] for column in inspector.get_columns(table)}
+    added = [name for name in columns if name not in existing]
+    for name in added:
+        conn.execute(text(f'ALTER TABLE "{table}" ADD COLUMN "{name}" {columns[name]}'))
+        logging.warning(f"Added column {name} to existing table {table}; its earlier rows have no {name}")
+    return added
+
+
+def delete_source_rows(conn, table, source_names):
+    # Remove the rows previously loaded by `source_names`; returns the number of deleted rows
+    from sqlalchemy import bindparam, inspect, text
+
+    if not inspect(conn).has_table(table):
+        return 0
+    statement = text(f'DELETE FROM "{table}" WHERE "{SOURCE_COLUMN}" IN :names').bindparams(
+        bindparam('names', expanding=True))
+    return conn.execute(statement, {'names': list(source_names)}).rowcount
+
+
+def count_table_rows(conn, table):
+    # Current row count of table, 0 if it does not exist yet
+    from sqlalchemy import inspect, text
+
+    if not inspect(conn).has_table(table):
+        return 0
+    return conn.execute(text(f'SELECT COUNT(*) FROM "{table}"')).scalar()
+
+
+def verify_loaded_rows(engine, table, run_id=None):
+    # Row counts in the DB: per batch_id for this run when lineage columns are
+    # present (a single indexed query), otherwise the table total
+    from sqlalchemy import text
+
+    with engine.connect() as conn:
+        if run_id is None:
+            return {None: conn.execute(text(f'SELECT COUNT(*) FROM "{table}"')).scalar()}
+        result = conn.execute(
+            text(f'SELECT batch_id, COUNT(*) FROM "{table}" WHERE run_id = :run_id GROUP BY batch_id'),
+            {'run_id': run_id}
+        )
+        return {batch_id: count for batch_id, count in result}
+
+
+def create_lineage_index(engine, table):
+    # Index (run_id, batch_id) so single batches can be verified or rolled back cheaply
+    from sqlalchemy import text
+
+    with engine.begin() as conn:
+        conn.execute(text(f'CREATE INDEX IF NOT EXISTS "ix_{table}_lineage" ON "{table}" (run_id, batch_id)'))
+
+
+class RunManifest:
+    """Per-run record of source files, batches and verified row counts."""
+
+    def __init__(self, run_id, config_file, lineage_columns=False):
+        self.run_id = run_id
+        self.config_file = config_file
+        self.lineage_columns = lineage_columns
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self.tables = {}
+        self.error = None
+
+    def _table(self, table):
+        return self.tables.setdefault(table, {'batches': [], 'db_rows': None, 'verified': None})
+
+    def add_batch(self, table, batch):
+        self._table(table)['batches'].append(batch)
+
+    def verify(self, table, db_counts, rows_before=0):
+        # Compare DB row counts with the batches loaded in this run (on top of the
+        # `rows_before` already in an appended table); returns True if they match
+        entry = self._table(table)
+        loaded = [batch for batch in entry['batches'] if batch['loaded']]
+        if self.lineage_columns:
+            for batch in loaded:
+                batch['db_rows'] = db_counts.get(batch['batch_id'], 0)
+            entry['db_rows'] = sum(db_counts.values())
+            entry['verified'] = all(batch['db_rows'] == batch['rows_out'] for batch in loaded)
+        else:
+            entry['db_rows'] = db_counts.get(None)
+            entry['rows_before'] = rows_before
+            entry['verified'] = entry['db_rows'] == rows_before + sum(batch['rows_out'] for batch in loaded)
+        return entry['verified']
+
+    def to_dict(self, status):
+        tables = {}
+        for table, entry in self.tables.items():
+            batches = entry['batches']
+            tables[table] = {
+                'rows_in': sum(batch['rows_in'] for batch in batches),
+                'rows_out': sum(batch['rows_out'] for batch in batches),
+                'dropped_duplicates': sum(batch['dropped_duplicates'] for batch in batches),
+                'loaded_rows': sum(batch['rows_out'] for batch in batches if batch['loaded']),
+                'rows_before': entry.get('rows_before'),
+                'db_rows': entry['db_rows'],
+                'verified': entry['verified'],
+                'batches': sorted(batches, key=lambda batch: batch['batch_id']),
+            }
+        return {
+            'run_id': self.run_id,
+            'status': status,
+            'config_file': self.config_file,
+            'started_at': self.started_at,
+            'finished_at': datetime.now().isoformat(timespec='seconds'),
+            'lineage_columns': self.lineage_columns,
+            'error': self.error,
+            'tables': tables,
+        }
+
+    def write(self, manifest_dir, status):
+        os.makedirs(manifest_dir, exist_ok=True)
+        path = os.path.join(manifest_dir, f"{self.run_id}.json")
+        with open(path, 'x') as f:
+            json.dump(self.to_dict(status), f, indent=2)
+        logging.info(f"Run manifest written to {path}")
+        return path
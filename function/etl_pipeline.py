@@ -1,21 +1,49 @@
-import pandas as pd
+import io
 import logging
+import os
+import time
 import configparser
-from sqlalchemy import create_engine
-from sqlalchemy.engine import URL
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("/Users/szjm/A9/logs/etl_pipeline.log"),  # Log to file
-        logging.StreamHandler()                          # Log to console
-    ]
-)
+from etl_config import load_pipeline_config, select_sources, sources_by_table
+from etl_inputs import HashingReader, codec_summary, detect_compression, is_remote, record_extract, reset_codec_stats
+from etl_manifest import (LINEAGE_COLUMNS, SOURCE_COLUMN, RunManifest, add_lineage_columns, add_missing_columns,
+                          add_source_column, count_table_rows, create_lineage_index, delete_source_rows, describe_batch,
+                          failed_batch, file_fingerprint, new_run_id, verify_loaded_rows)
+from etl_profiling import configure_profiling, begin_run, profile_stage, profiling_enabled
+
+# pandas and SQLAlchemy are imported inside the functions that need them so that
+# importing this module (from the CLI, the scheduler, tests or short-lived
+# workers) stays cheap and has no side effects.
+
+# Defaults are relative to the current directory (the project root when run as
+# documented), never to where this module is installed.
+DEFAULT_CONFIG_FILE = os.environ.get('ETL_CONFIG', 'config.ini')
+DEFAULT_LOG_FILE = os.environ.get('ETL_LOG_FILE', os.path.join('logs', 'etl_pipeline.log'))
+
+
+def __getattr__(name):
+    # Resolve `etl_pipeline.pd` lazily (used by callers and tests that patch pandas)
+    if name == 'pd':
+        import pandas
+        return pandas
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def setup_logging(log_file=DEFAULT_LOG_FILE, level=logging.INFO):
+    # Configure logging to file and console; called by entry points, never at import
+    handlers = [logging.StreamHandler()]                 # Log to console
+    if log_file:
+        os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
+        handlers.append(logging.FileHandler(log_file))   # Log to file
+    logging.basicConfig(
+        level=level,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=handlers
+    )
 
 def auth(config_file, section):
     # Read database configuration and return DB URI
+    from sqlalchemy.engine import URL
+
     config = configparser.ConfigParser()
     config.read(config_file)
 
@@ -37,129 +65,128 @@ def auth(config_file, section):
     return connection_url
 
 
-def extract_data(file_path):
-    #Extract data from a CSV file
+def extract_data(file_path, columns=None, dtype=None, compression='infer', profile_name=None, fingerprint=None):
+    #Extract data from a (optionally compressed) CSV file, checking that the required `columns` are present.
+    #If a `fingerprint` dict is given, it is filled with the file's size and sha256 hashed during the read.
+    import pandas as pd
+
     try:
-        logging.info(f"Extracting data from {file_path}")
-        return pd.read_csv(file_path)
+        codec = detect_compression(file_path, compression)
+        logging.info(f"Extracting data from {file_path}" + (f" ({codec})" if codec else ""))
+        with profile_stage(profile_name or f"extract.{os.path.basename(file_path)}"):
+            # Timed inside the profiled block, so profiler overhead never skews the codec figures
+            start_wall, start_cpu = time.perf_counter(), time.thread_time()
+            # Decompression is streamed into the parser, no temporary files are written
+            if fingerprint is None or codec == 'zip' or is_remote(file_path):
+                data = pd.read_csv(file_path, dtype=dtype or None, compression=codec)
+            else:
+                with open(file_path, 'rb', buffering=0) as f:
+                    raw = HashingReader(f)
+                    data = pd.read_csv(io.BufferedReader(raw), dtype=dtype or None, compression=codec)
+                    fingerprint.update(raw.fingerprint())
+            wall_time, cpu_time = time.perf_counter() - start_wall, time.thread_time() - start_cpu
+        if fingerprint is not None and not fingerprint:
+            # zip archives need seekable access and URLs are not hashed while streamed
+            fingerprint.update(file_fingerprint(file_path))
+        record_extract(file_path, codec, len(data), wall_time, cpu_time)
+
+        missing = [column for column in (columns or []) if column not in data.columns]
+        if missing:
+            raise ValueError(f"{file_path} is missing required column(s): {', '.join(missing)}")
+        return data
     except Exception as e:
         logging.error(f"Error extracting data: {e}")
         raise
 
 
-def transform_data(branch_sales, online_sales, customer_data, inventory_data):
-    # Transform data: standardise formats, handle missing values, and calculate metrics
-    try:
-        # Transform Branch Sales Data
-        logging.info("Transforming branch sales data...")
-        branch_sales['timestamp'] = pd.to_datetime(branch_sales['timestamp'], format='%m/%d/%Y', errors='coerce')
-
-        # Log rows with invalid timestamps
-        invalid_timestamps = branch_sales[branch_sales['timestamp'].isna()]
-        if not invalid_timestamps.empty:
-            logging.warning(f"Found {len(invalid_timestamps)} rows with invalid timestamps in branch sales.")
-            print(invalid_timestamps)
-
-        # Handle missing values and calculate `total_sale`
-        branch_sales = branch_sales.assign(
-            timestamp=branch_sales['timestamp'].fillna(pd.Timestamp('1970-01-01 00:00:00')),
-            quantity=branch_sales['quantity'].fillna(0),
-            price=branch_sales['price'].fillna(0.0),
-            total_sale=lambda x: x['quantity'] * x['price']
-        ).drop_duplicates()
-
-        # Transform Online Sales Data
-        logging.info("Transforming online sales data...")
-        online_sales['timestamp'] = pd.to_datetime(online_sales['timestamp'], format='%m/%d/%Y', errors='coerce')
-
-        # Log rows with invalid timestamps
-        invalid_timestamps = online_sales[online_sales['timestamp'].isna()]
-        if not invalid_timestamps.empty:
-            logging.warning(f"Found {len(invalid_timestamps)} rows with invalid timestamps in online sales.")
-            print(invalid_timestamps)
-
-        # Handle missing values and calculate `total_sale`
-        online_sales = online_sales.assign(
-            timestamp=online_sales['timestamp'].fillna(pd.Timestamp('1970-01-01 00:00:00')),
-            quantity=online_sales['quantity'].fillna(0),
-            price=online_sales['price'].fillna(0.0),
-            delivery_address=online_sales['delivery_address'].fillna('Unknown'),
-            total_sale=lambda x: x['quantity'] * x['price']
-        ).drop_duplicates()
-
-        # Transform Customer Data
-        logging.info("Transforming customer data...")
-        customer_data = customer_data.drop_duplicates().assign(
-            email=customer_data['email'].str.lower(),
-            loyalty_status=customer_data['loyalty_status'].fillna('Unknown')
-        )
-
-        # Transform Inventory Data
-        logging.info("Transforming inventory data...")
-        inventory_data = inventory_data.drop_duplicates().assign(
-            stock_level=inventory_data['stock_level'].fillna(0),
-            reorder_level=inventory_data['reorder_level'].fillna(0),
-            reorder_status=lambda x: x['stock_level'] < x['reorder_level']
-        )
+def transform_branch_sales(branch_sales):
+    # Standardise timestamps, handle missing values and calculate `total_sale`
+    import pandas as pd
+
+    logging.info("Transforming branch sales data...")
+    branch_sales['timestamp'] = pd.to_datetime(branch_sales['timestamp'], format='%m/%d/%Y', errors='coerce')
+
+    # Log rows with invalid timestamps
+    invalid_timestamps = branch_sales[branch_sales['timestamp'].isna()]
+    if not invalid_timestamps.empty:
+        logging.warning(f"Found {len(invalid_timestamps)} rows with invalid timestamps in branch sales.")
+        print(invalid_timestamps)
+
+    # Handle missing values and calculate `total_sale`
+    return branch_sales.assign(
+        timestamp=branch_sales['timestamp'].fillna(pd.Timestamp('1970-01-01 00:00:00')),
+        quantity=branch_sales['quantity'].fillna(0),
+        price=branch_sales['price'].fillna(0.0),
+        total_sale=lambda x: x['quantity'] * x['price']
+    ).drop_duplicates()
+
+
+def transform_online_sales(online_sales):
+    # Standardise timestamps, handle missing values and calculate `total_sale`
+    import pandas as pd
+
+    logging.info("Transforming online sales data...")
+    online_sales['timestamp'] = pd.to_datetime(online_sales['timestamp'], format='%m/%d/%Y', errors='coerce')
+
+    # Log rows with invalid timestamps
+    invalid_timestamps = online_sales[online_sales['timestamp'].isna()]
+    if not invalid_timestamps.empty:
+        logging.warning(f"Found {len(invalid_timestamps)} rows with invalid timestamps in online sales.")
+        print(invalid_timestamps)
+
+    # Handle missing values and calculate `total_sale`
+    return online_sales.assign(
+        timestamp=online_sales['timestamp'].fillna(pd.Timestamp('1970-01-01 00:00:00')),
+        quantity=online_sales['quantity'].fillna(0),
+        price=online_sales['price'].fillna(0.0),
+        delivery_address=online_sales['delivery_address'].fillna('Unknown'),
+        total_sale=lambda x: x['quantity'] * x['price']
+    ).drop_duplicates()
+
+
+def transform_customer_data(customer_data):
+    # Deduplicate, lower-case emails and fill missing loyalty status
+    logging.info("Transforming customer data...")
+    return customer_data.drop_duplicates().assign(
+        email=customer_data['email'].str.lower(),
+        loyalty_status=customer_data['loyalty_status'].fillna('Unknown')
+    )
 
-        logging.info("Transformation complete.")
-        return branch_sales, online_sales, customer_data, inventory_data
 
-    except Exception as e:
-        logging.error(f"Error during transformation: {e}")
-        raise
+def transform_inventory_data(inventory_data):
+    # Deduplicate, fill missing levels and flag items that need reordering
+    logging.info("Transforming inventory data...")
+    return inventory_data.drop_duplicates().assign(
+        stock_level=inventory_data['stock_level'].fillna(0),
+        reorder_level=inventory_data['reorder_level'].fillna(0),
+        reorder_status=lambda x: x['stock_level'] < x['reorder_level']
+    )
+
+
+# Transform rules that sources can refer to by name (`transform = ...` in config.ini)
+TRANSFORMS = {
+    'branch_sales': transform_branch_sales,
+    'online_sales': transform_online_sales,
+    'customer_data': transform_customer_data,
+    'inventory_data': transform_inventory_data,
+}
+
 
-    #Transform data: standardise formats, handle missing values, and calculate metrics
+def transform_table(transform, data, profile_name=None):
+    # Apply the named transform rule to one table
+    if transform not in TRANSFORMS:
+        raise ValueError(f"Unknown transform '{transform}', expected one of: {', '.join(TRANSFORMS)}")
+    with profile_stage(profile_name or f"transform.{transform}"):
+        return TRANSFORMS[transform](data)
+
+
+def transform_data(branch_sales, online_sales, customer_data, inventory_data):
+    # Transform data: standardise formats, handle missing values, and calculate metrics
     try:
-        # Transform Branch Sales Data
-        logging.info("Transforming branch sales data...")
-        branch_sales['timestamp'] = pd.to_datetime(branch_sales['timestamp'], format='%m/%d/%Y', errors='coerce')
-
-        # Log rows with invalid timestamps
-        invalid_timestamps = branch_sales[branch_sales['timestamp'].isna()]
-        if not invalid_timestamps.empty:
-            logging.warning(f"Found {len(invalid_timestamps)} rows with invalid timestamps in branch sales.")
-            print(invalid_timestamps)
-
-        # Fill invalid timestamps with a default value
-        branch_sales['timestamp'].fillna(pd.Timestamp('1970-01-01 00:00:00'), inplace=True)
-        branch_sales['quantity'].fillna(0, inplace=True)
-        branch_sales['price'].fillna(0.0, inplace=True)
-        branch_sales['total_sale'] = branch_sales['quantity'] * branch_sales['price']
-        branch_sales.drop_duplicates(inplace=True)
-
-        # Transform Online Sales Data
-        logging.info("Transforming online sales data...")
-        online_sales['timestamp'] = pd.to_datetime(online_sales['timestamp'], format='%m/%d/%Y', errors='coerce')
-
-        # Log rows with invalid timestamps
-        invalid_timestamps = online_sales[online_sales['timestamp'].isna()]
-        if not invalid_timestamps.empty:
-            logging.warning(f"Found {len(invalid_timestamps)} rows with invalid timestamps in online sales.")
-            print(invalid_timestamps)
-
-        # Fill invalid timestamps with a default value
-        online_sales['timestamp'].fillna(pd.Timestamp('1970-01-01 00:00:00'), inplace=True)
-        online_sales['quantity'].fillna(0, inplace=True)
-        online_sales['price'].fillna(0.0, inplace=True)
-        online_sales['delivery_address'].fillna('Unknown', inplace=True)
-        online_sales['total_sale'] = online_sales['quantity'] * online_sales['price']
-        online_sales.drop_duplicates(inplace=True)
-
-        # Transform Customer Data
-        logging.info("Transforming customer data...")
-        customer_data = customer_data.drop_duplicates().assign(
-            email=customer_data['email'].str.lower(),
-            loyalty_status=customer_data['loyalty_status'].fillna('Unknown')
-        )
-
-        # Transform Inventory Data
-        logging.info("Transforming inventory data...")
-        inventory_data = inventory_data.drop_duplicates().assign(
-            stock_level=inventory_data['stock_level'].fillna(0),
-            reorder_level=inventory_data['reorder_level'].fillna(0),
-            reorder_status=inventory_data['stock_level'] < inventory_data['reorder_level']
-        )
+        branch_sales = transform_table('branch_sales', branch_sales)
+        online_sales = transform_table('online_sales', online_sales)
+        customer_data = transform_table('customer_data', customer_data)
+        inventory_data = transform_table('inventory_data', inventory_data)
 
         logging.info("Transformation complete.")
         return branch_sales, online_sales, customer_data, inventory_data
@@ -169,43 +196,190 @@ def transform_data(branch_sales, online_sales, customer_data, inventory_data):
         raise
 
 
-def load_data_to_db(data, table_name, engine):
-    # Load data into a PostgreSQL database
+def load_data_to_db(data, table_name, engine, if_exists='replace', profile_name=None):
+    # Load data into a PostgreSQL database (`engine` may also be a connection inside a transaction)
     try:
         logging.info(f"Loading data into {table_name}")
-        data.to_sql(table_name, engine, if_exists='replace', index=False)
+        with profile_stage(profile_name or f"load.{table_name}"):
+            data.to_sql(table_name, engine, if_exists=if_exists, index=False)
         logging.info(f"Successfully loaded data into {table_name}")
     except Exception as e:
         logging.error(f"Error loading data into database: {e}")
         raise
 
 
-if __name__ == "__main__":
+def shard_name(source, batch_id):
+    # Unique per shard of a run, so profile artifacts of different shards do not overwrite each other
+    return f"{source.name}.{batch_id}"
+
+
+def process_shard(source, file_path, batch_id=None, run_id=None):
+    # Extract and transform one input file of a source; returns the data and its manifest batch
+    shard = shard_name(source, batch_id)
+    fingerprint = {}
+    data = extract_data(file_path, columns=source.columns, dtype=source.dtypes,
+                        compression=source.compression,
+                        profile_name=f"extract.{shard}", fingerprint=fingerprint)
+    rows_in = len(data)
+    data = transform_table(source.transform, data, profile_name=f"transform.{source.transform}.{shard}")
+
+    # Checksums cover the transformed business columns, before lineage columns are added
+    batch = describe_batch(source, file_path, batch_id, rows_in, data, fingerprint)
+    if run_id is not None:
+        data = add_lineage_columns(data, run_id, batch_id)
+    return data, batch
+
+
+def _iter_shards(shards, max_workers, run_id=None):
+    # Process shards and yield (source, file_path, batch_id, result, error) as they finish.
+    # With a single worker everything runs in the calling thread, so each shard's
+    # extract, transform and the caller's load happen one after the other.
+    numbered = [(batch_id, source, file_path) for batch_id, (source, file_path) in enumerate(shards, start=1)]
+    if max_workers <= 1:
+        for batch_id, source, file_path in numbered:
+            try:
+                result = process_shard(source, file_path, batch_id, run_id)
+            except Exception as e:
+                yield source, file_path, batch_id, None, e
+            else:
+                yield source, file_path, batch_id, result, None
+        return
+
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(process_shard, source, file_path, batch_id, run_id): (source, file_path, batch_id)
+                   for batch_id, source, file_path in numbered}
+        for future in as_completed(futures):
+            source, file_path, batch_id = futures[future]
+            try:
+                yield source, file_path, batch_id, future.result(), None
+            except Exception as e:
+                yield source, file_path, batch_id, None, e
+
+
+def run_pipeline(config_file=DEFAULT_CONFIG_FILE, sources=None):
+    # Run the ETL pipeline once for all configured sources (or only `sources`)
+    from sqlalchemy import create_engine
+
+    pipeline_config = load_pipeline_config(config_file)
+    selected = select_sources(pipeline_config.sources, sources)
+    lineage = pipeline_config.lineage_columns
+
     # Database configuration
-    CONFIG_FILE = '/Users/szjm/A9/config.ini'
-    DB_URI = auth(CONFIG_FILE, 'postgresql')
-
-    # Create a single engine instance
-    engine = create_engine(DB_URI)
-
-    # File paths
-    BRANCH_SALES_PATH = '/Users/szjm/A9/data/Branch_Sales_Data_With_Issues.csv'
-    ONLINE_SALES_PATH = '/Users/szjm/A9/data/Online_Sales_Data_With_Issues.csv'
-    CUSTOMER_DATA_PATH = '/Users/szjm/A9/data/Customer_Data_With_Issues.csv'
-    INVENTORY_DATA_PATH = '/Users/szjm/A9/data/Inventory_Data_With_Issues.csv'
-
-    # ETL Pipeline
-    branch_sales = extract_data(BRANCH_SALES_PATH)
-    online_sales = extract_data(ONLINE_SALES_PATH)
-    customer_data = extract_data(CUSTOMER_DATA_PATH)
-    inventory_data = extract_data(INVENTORY_DATA_PATH)
-
-    branch_sales_transformed, online_sales_transformed, customer_data_transformed, inventory_data_transformed = transform_data(
-        branch_sales, online_sales, customer_data, inventory_data
-    )
+    DB_URI = auth(config_file, 'postgresql')
+
+    # Every run gets an id shared by its manifest, lineage columns and profiles
+    run_id = new_run_id()
+    manifest = RunManifest(run_id, config_file, lineage_columns=lineage)
+    logging.info(f"Run {run_id} started")
 
-    # Load data into the database
-    load_data_to_db(branch_sales_transformed, 'branch_sales', engine)
-    load_data_to_db(online_sales_transformed, 'online_sales', engine)
-    load_data_to_db(customer_data_transformed, 'customer_data', engine)
-    load_data_to_db(inventory_data_transformed, 'inventory_data', engine)
+    # From here on every outcome, including config and DB errors, ends in a written manifest
+    status = 'failed'
+    try:
+        # Optional per-stage profiling (see etl_profiling.py)
+        configure_profiling(config_file)
+        begin_run(str(run_id))
+
+        # Create a single engine instance
+        engine = create_engine(DB_URI)
+
+        # Fan out: every file matching a source's path is an independent shard (one manifest batch)
+        reset_codec_stats()
+        failed = set()
+        shards = []
+        for source in selected:
+            files = source.files()
+            if not files:
+                logging.error(f"No input files match {source.path} for source '{source.name}'")
+                failed.add(source.name)
+            shards.extend((source, file_path) for file_path in files)
+
+        # A table is replaced when this run covers every source that loads into it.
+        # Otherwise only the selected sources' rows are replaced: tables shared by
+        # several sources tag their rows with the source, and those rows are deleted
+        # before the new ones are appended, so repeated runs never duplicate a feed.
+        table_sources = sources_by_table(pipeline_config.sources)
+        selected_names = {source.name for source in selected}
+        shared_tables = {table for table, names in table_sources.items() if len(names) > 1}
+        replace_tables = {source.table for source in selected
+                          if set(table_sources[source.table]) <= selected_names}
+        partial_tables = {source.table for source in selected} - replace_tables
+
+        max_workers = pipeline_config.max_workers
+        if profiling_enabled():
+            # cProfile and tracemalloc are not safe across threads: while profiling, run
+            # extract, transform and load of every shard sequentially on this thread
+            max_workers = 1
+
+        # All loads of the run share one transaction, so readers never see a table
+        # (or a source's rows) half replaced; each shard gets a savepoint so a failed
+        # shard does not undo the others
+        loaded_tables = set()
+        rows_before = {}
+        with engine.begin() as conn:
+            for table in sorted(partial_tables):
+                if table in shared_tables:
+                    add_missing_columns(conn, table, {SOURCE_COLUMN: 'TEXT'})
+                    deleted = delete_source_rows(conn, table, [name for name in table_sources[table]
+                                                               if name in selected_names])
+                    logging.info(f"Removed {deleted} rows of the selected sources from {table}")
+                if lineage:
+                    # Tables created before lineage was switched on get the columns added
+                    add_missing_columns(conn, table, LINEAGE_COLUMNS)
+                else:
+                    # Without lineage columns, appended tables are verified against their remaining rows
+                    rows_before[table] = count_table_rows(conn, table)
+
+            # Extract and transform shards in parallel; load them one by one as they finish
+            for source, file_path, batch_id, result, error in _iter_shards(shards, max_workers, run_id if lineage else None):
+                if error is not None:
+                    logging.error(f"Shard {file_path} of source '{source.name}' failed: {error}")
+                    manifest.add_batch(source.table, failed_batch(source, file_path, batch_id, error))
+                    failed.add(source.name)
+                    continue
+
+                data, batch = result
+                manifest.add_batch(source.table, batch)
+                if source.table in shared_tables:
+                    data = add_source_column(data, source.name)
+                try:
+                    # The first shard loaded into a fully covered table replaces it, all others append
+                    replace = source.table in replace_tables and source.table not in loaded_tables
+                    if_exists = 'replace' if replace else 'append'
+                    with conn.begin_nested():
+                        load_data_to_db(data, source.table, conn, if_exists=if_exists,
+                                        profile_name=f"load.{source.table}.{shard_name(source, batch_id)}")
+                    loaded_tables.add(source.table)
+                    batch['loaded'] = True
+                except Exception as e:
+                    logging.error(f"Shard {file_path} of source '{source.name}' failed: {e}")
+                    batch['error'] = str(e)
+                    failed.add(source.name)
+
+        # Cheap post-load check: row counts per batch (or per table) against the manifest
+        for table in sorted(loaded_tables):
+            if lineage:
+                create_lineage_index(engine, table)
+            db_counts = verify_loaded_rows(engine, table, run_id if lineage else None)
+            if not manifest.verify(table, db_counts, rows_before.get(table, 0)):
+                logging.error(f"Row counts in {table} do not match the rows loaded by run {run_id}")
+                failed.update(source.name for source in selected if source.table == table)
+
+        for line in codec_summary():
+            logging.info(line)
+
+        if failed:
+            raise RuntimeError(f"ETL pipeline failed for source(s): {', '.join(sorted(failed))}")
+        status = 'succeeded'
+
+    except Exception as e:
+        manifest.error = str(e)
+        raise
+    finally:
+        manifest.write(pipeline_config.manifest_dir, status)
+
+
+if __name__ == "__main__":
+    setup_logging()
+    run_pipeline()
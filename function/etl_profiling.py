@@ -0,0 +1,166 @@
+import configparser
+import io
+import logging
+import os
+import re
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# Profiling is switched on through the [profiling] section of config.ini or the
+# ETL_PROFILE* environment variables (which take precedence), e.g.
+#
+#   ETL_PROFILE=cprofile,tracemalloc ETL_PROFILE_DIR=/tmp/etl_profiles
+#
+# A relative `output_dir` in config.ini is resolved against config.ini, like
+# the manifest directory and source paths; ETL_PROFILE_DIR is used as given.
+# Supported modes are `cprofile` and `tracemalloc`. When no mode is enabled the
+# stage hooks only cost a single attribute check, so they stay in production.
+
+PROFILE_MODES = ('cprofile', 'tracemalloc')
+
+_DEFAULTS = {
+    'modes': (),
+    'output_dir': 'profiles',
+    'top_n': 20,
+}
+_settings = dict(_DEFAULTS)
+_run_dir = None
+
+
+def _parse_modes(value):
+    # Accept "cprofile,tracemalloc", "all", "off", "" etc.
+    value = (value or '').strip().lower()
+    if value in ('', '0', 'off', 'false', 'no', 'none'):
+        return ()
+    if value in ('1', 'on', 'true', 'yes', 'all'):
+        return PROFILE_MODES
+    modes = tuple(mode.strip() for mode in value.split(',') if mode.strip())
+    unknown = [mode for mode in modes if mode not in PROFILE_MODES]
+    if unknown:
+        raise ValueError(f"Unknown profiling mode(s): {', '.join(unknown)}")
+    return modes
+
+
+def configure_profiling(config_file=None, section='profiling'):
+    # Read profiling settings from config, then apply environment overrides
+    settings = dict(_DEFAULTS)
+
+    if config_file:
+        config = configparser.ConfigParser()
+        config.read(config_file)
+        if config.has_section(section):
+            settings['modes'] = _parse_modes(config.get(section, 'enabled', fallback=''))
+            settings['output_dir'] = config.get(section, 'output_dir', fallback=settings['output_dir'])
+            settings['top_n'] = config.getint(section, 'top_n', fallback=settings['top_n'])
+        base_dir = os.path.dirname(os.path.abspath(config_file))
+        settings['output_dir'] = os.path.join(base_dir, os.path.expanduser(settings['output_dir']))
+
+    if 'ETL_PROFILE' in os.environ:
+        settings['modes'] = _parse_modes(os.environ['ETL_PROFILE'])
+    settings['output_dir'] = os.environ.get('ETL_PROFILE_DIR', settings['output_dir'])
+    settings['top_n'] = int(os.environ.get('ETL_PROFILE_TOP', settings['top_n']))
+
+    _settings.update(settings)
+    if _settings['modes']:
+        logging.info(f"Profiling enabled ({', '.join(_settings['modes'])}), "
+                     f"writing artifacts to {_settings['output_dir']}")
+    return dict(_settings)
+
+
+def profiling_enabled():
+    return bool(_settings['modes'])
+
+
+def begin_run(run_id=None):
+    # Start a new profiling run; artifacts for each stage go into one directory per run
+    global _run_dir
+    if not _settings['modes']:
+        _run_dir = None
+        return None
+    run_id = run_id or datetime.now().strftime('%Y%m%dT%H%M%S')
+    _run_dir = os.path.join(_settings['output_dir'], run_id)
+    os.makedirs(_run_dir, exist_ok=True)
+    return _run_dir
+
+
+def _artifact_path(stage, suffix):
+    if _run_dir is None:
+        begin_run()
+    safe_stage = re.sub(r'[^A-Za-z0-9_.-]+', '_', stage)
+    return os.path.join(_run_dir, f"{safe_stage}.{suffix}")
+
+
+@contextmanager
+def profile_stage(stage):
+    # Profile a pipeline stage when profiling is enabled, otherwise do nothing
+    modes = _settings['modes']
+    if not modes:
+        yield
+        return
+
+    profiler = None
+    tracing_started = False
+    if 'tracemalloc' in modes:
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            tracing_started = True
+        snapshot_before = tracemalloc.take_snapshot()
+        if not tracing_started and hasattr(tracemalloc, 'reset_peak'):
+            # Report this stage's own peak, not the highest since tracing started (Python 3.9+)
+            tracemalloc.reset_peak()
+    if 'cprofile' in modes:
+        import cProfile
+        profiler = cProfile.Profile()
+
+    start = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        elapsed = time.perf_counter() - start
+        logging.info(f"[profile] {stage} took {elapsed:.3f}s")
+
+        if profiler is not None:
+            _report_cprofile(stage, profiler)
+        if 'tracemalloc' in modes:
+            _report_tracemalloc(stage, snapshot_before, tracing_started)
+
+
+def _report_cprofile(stage, profiler):
+    # Dump stats for offline flamegraphs (e.g. snakeviz, flameprof) and log the hotspots
+    import pstats
+
+    path = _artifact_path(stage, 'prof')
+    profiler.dump_stats(path)
+
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats('cumulative').print_stats(_settings['top_n'])
+    logging.info(f"[profile] {stage} top {_settings['top_n']} hotspots "
+                 f"(full profile: {path}):\n{stream.getvalue()}")
+
+
+def _report_tracemalloc(stage, snapshot_before, tracing_started):
+    # Write allocation differences for the stage and log the largest ones
+    import tracemalloc
+
+    snapshot_after = tracemalloc.take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    if tracing_started:
+        tracemalloc.stop()
+
+    top_stats = snapshot_after.compare_to(snapshot_before, 'lineno')
+    path = _artifact_path(stage, 'tracemalloc.txt')
+    with open(path, 'w') as f:
+        f.write(f"current={current} peak={peak}\n")
+        for stat in top_stats:
+            f.write(f"{stat}\n")
+
+    top = '\n'.join(str(stat) for stat in top_stats[:_settings['top_n']])
+    logging.info(f"[profile] {stage} memory current={current / 1e6:.1f}MB peak={peak / 1e6:.1f}MB "
+                 f"(full report: {path}), top allocations:\n{top}")
@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+import etl_cli
+
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_CONFIG = os.path.join(os.path.dirname(MODULE_DIR), 'config.ini')
+
+
+class TestETLCli(unittest.TestCase):
+
+    def test_import_has_no_side_effects(self):
+        # Importing the modules must not pull in heavy dependencies, configure logging or schedule jobs
+        code = (
+            "import sys, logging\n"
+            "import etl_cli, etl_pipeline, etl_scheduler\n"
+            "heavy = [m for m in ('pandas', 'sqlalchemy', 'schedule') if m in sys.modules]\n"
+            "assert not heavy, heavy\n"
+            "assert not logging.getLogger().handlers, logging.getLogger().handlers\n"
+        )
+        result = subprocess.run([sys.executable, '-c', code], cwd=MODULE_DIR,
+                                capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    def test_validate_default_config(self):
+        with patch('etl_cli.setup_logging'):
+            self.assertEqual(etl_cli.main(['--config', REPO_CONFIG, 'validate']), 0)
+
+    def test_defaults_do_not_depend_on_install_location(self):
+        # The config and log defaults resolve against the working directory, not the module path
+        code = "import etl_pipeline; print(etl_pipeline.DEFAULT_CONFIG_FILE); print(etl_pipeline.DEFAULT_LOG_FILE)"
+        env = {key: value for key, value in os.environ.items() if key not in ('ETL_CONFIG', 'ETL_LOG_FILE')}
+        env['PYTHONPATH'] = MODULE_DIR
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            result = subprocess.run([sys.executable, '-c', code], cwd=tmp_dir, env=env,
+                                    capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.split(), ['config.ini', os.path.join('logs', 'etl_pipeline.log')])
+
+    def test_validate_reports_missing_db_settings(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            config_file = os.path.join(tmp_dir, 'config.ini')
+            with open(config_file, 'w') as f:
+                f.write("[postgresql]\nuser = etl\n")
+            problems = etl_cli.validate_config(config_file)
+        self.assertIn("Missing 'password' in [postgresql]", problems)
+
+    def test_run_dispatches_to_pipeline(self):
+        with patch('etl_cli.setup_logging'), patch('etl_pipeline.run_pipeline') as mock_run:
+            self.assertEqual(etl_cli.main(['--config', 'other.ini', 'run']), 0)
+        mock_run.assert_called_once_with('other.ini', None)
+
+
+if __name__ == '__main__':
+    unittest.main()
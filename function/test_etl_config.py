@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+from etl_config import load_pipeline_config, select_sources
+
+
+class TestETLConfig(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.config_file = os.path.join(self.tmp_dir.name, 'config.ini')
+        os.makedirs(os.path.join(self.tmp_dir.name, 'feeds'))
+        for name in ('branch_sales_1.csv', 'branch_sales_2.csv', 'other.csv'):
+            open(os.path.join(self.tmp_dir.name, 'feeds', name), 'w').close()
+
+        with open(self.config_file, 'w') as f:
+            f.write(
+                "[pipeline]\nschedule = 07:00\nmax_workers = 2\n\n"
+                "[source:branch_north]\npath = feeds/branch_sales_*.csv\ntable = branch_sales\n"
+                "transform = branch_sales\ncolumns = transaction_id, price\n"
+                "dtypes = item_id:int64, price:float64\n\n"
+                "[source:customers]\npath = feeds/other.csv\ntable = customer_data\n"
+                "transform = customer_data\nschedule = 06:00\n"
+            )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_load_sources(self):
+        pipeline_config = load_pipeline_config(self.config_file)
+        self.assertEqual(pipeline_config.max_workers, 2)
+        self.assertEqual([source.name for source in pipeline_config.sources], ['branch_north', 'customers'])
+
+        branch = pipeline_config.sources[0]
+        self.assertEqual(branch.table, 'branch_sales')
+        self.assertEqual(branch.columns, ['transaction_id', 'price'])
+        self.assertEqual(branch.dtypes, {'item_id': 'int64', 'price': 'float64'})
+        self.assertEqual(branch.schedule, '07:00')
+        self.assertEqual(pipeline_config.sources[1].schedule, '06:00')
+        self.assertEqual(branch.compression, 'infer')
+
+    def test_invalid_compression_raises(self):
+        with open(self.config_file, 'a') as f:
+            f.write("compression = lz4\n")
+        with self.assertRaises(ValueError):
+            load_pipeline_config(self.config_file)
+
+    def test_remote_path_is_kept(self):
+        with open(self.config_file, 'a') as f:
+            f.write("\n[source:remote]\npath = https://example.com/sales.csv.gz\n"
+                    "table = branch_sales\ntransform = branch_sales\n")
+        remote = load_pipeline_config(self.config_file).sources[-1]
+        self.assertEqual(remote.files(), ['https://example.com/sales.csv.gz'])
+
+    def test_manifest_and_lineage_settings(self):
+        pipeline_config = load_pipeline_config(self.config_file)
+        self.assertEqual(pipeline_config.manifest_dir, os.path.join(self.tmp_dir.name, 'manifests'))
+        self.assertFalse(pipeline_config.lineage_columns)
+
+    def test_glob_resolves_relative_to_config(self):
+        branch = load_pipeline_config(self.config_file).sources[0]
+        self.assertEqual([os.path.basename(path) for path in branch.files()],
+                         ['branch_sales_1.csv', 'branch_sales_2.csv'])
+
+    def test_missing_required_key_raises(self):
+        with open(self.config_file, 'a') as f:
+            f.write("\n[source:broken]\npath = feeds/other.csv\n")
+        with self.assertRaises(ValueError):
+            load_pipeline_config(self.config_file)
+
+    def test_select_sources(self):
+        sources = load_pipeline_config(self.config_file).sources
+        self.assertEqual([source.name for source in select_sources(sources, ['customers'])], ['customers'])
+        with self.assertRaises(ValueError):
+            select_sources(sources, ['unknown'])
+
+
+if __name__ == '__main__':
+    unittest.main()
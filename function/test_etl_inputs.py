@@ -0,0 +1,69 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+from etl_inputs import codec_summary, detect_compression, record_extract, reset_codec_stats, write_compressed
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+SAMPLE_CSV = os.path.join(DATA_DIR, 'Customer_Data.csv')
+HAS_ZSTANDARD = importlib.util.find_spec('zstandard') is not None
+
+
+class TestETLInputs(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        reset_codec_stats()
+
+    def tearDown(self):
+        reset_codec_stats()
+        self.tmp_dir.cleanup()
+
+    def test_detect_compression_from_magic_bytes(self):
+        for codec in ('gzip', 'bz2', 'zip'):
+            fixture = write_compressed(SAMPLE_CSV, self.tmp_dir.name, codec)
+            # Rename so the extension cannot give the codec away
+            renamed = os.path.join(self.tmp_dir.name, f'{codec}_export.csv')
+            os.rename(fixture, renamed)
+            self.assertEqual(detect_compression(renamed), codec)
+
+        zstd_file = os.path.join(self.tmp_dir.name, 'export.csv')
+        with open(zstd_file, 'wb') as f:
+            f.write(b'\x28\xb5\x2f\xfd' + b'\x00' * 8)
+        self.assertEqual(detect_compression(zstd_file), 'zstd')
+
+    @unittest.skipUnless(HAS_ZSTANDARD, 'zstandard is not installed')
+    def test_detect_zstd_from_magic_bytes(self):
+        fixture = write_compressed(SAMPLE_CSV, self.tmp_dir.name, 'zstd')
+        renamed = os.path.join(self.tmp_dir.name, 'zstd_export.csv')
+        os.rename(fixture, renamed)
+        self.assertEqual(detect_compression(renamed), 'zstd')
+
+    def test_plain_csv_has_no_codec(self):
+        self.assertIsNone(detect_compression(SAMPLE_CSV))
+
+    def test_remote_paths_use_extension(self):
+        self.assertEqual(detect_compression('https://example.com/daily/sales.csv.gz'), 'gzip')
+        self.assertEqual(detect_compression('s3://bucket/sales.csv.zst'), 'zstd')
+        self.assertIsNone(detect_compression('https://example.com/daily/sales.csv'))
+
+    def test_explicit_compression(self):
+        self.assertEqual(detect_compression(SAMPLE_CSV, 'bz2'), 'bz2')
+        self.assertIsNone(detect_compression(SAMPLE_CSV, 'none'))
+        with self.assertRaises(ValueError):
+            detect_compression(SAMPLE_CSV, 'lz4')
+
+    def test_codec_summary_aggregates(self):
+        fixture = write_compressed(SAMPLE_CSV, self.tmp_dir.name, 'gzip')
+        record_extract(fixture, 'gzip', 1000, 0.5, 0.4)
+        record_extract(fixture, 'gzip', 1000, 0.5, 0.4)
+        record_extract(SAMPLE_CSV, None, 1000, 0.1, 0.1)
+
+        summary = codec_summary()
+        self.assertEqual(len(summary), 2)
+        self.assertIn('gzip: 2 file(s), 2000 rows', summary[0])
+        self.assertIn('none: 1 file(s), 1000 rows', summary[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import hashlib
+import json
+import os
+import tempfile
+import unittest
+from etl_manifest import RunManifest, file_fingerprint, new_run_id
+
+
+def make_batch(batch_id, rows_in, rows_out, loaded=True):
+    return {
+        'batch_id': batch_id, 'source': 'branch_sales', 'file': f'shard_{batch_id}.csv',
+        'size': None, 'sha256': None, 'rows_in': rows_in, 'rows_out': rows_out,
+        'dropped_duplicates': rows_in - rows_out, 'checksum': None, 'loaded': loaded,
+    }
+
+
+class TestETLManifest(unittest.TestCase):
+
+    def test_new_run_id_is_compact_integer(self):
+        run_id = new_run_id()
+        self.assertIsInstance(run_id, int)
+        self.assertEqual(len(str(run_id)), 19)
+        self.assertLess(run_id, 2 ** 63)
+
+    def test_new_run_ids_are_unique_within_a_second(self):
+        run_ids = [new_run_id() for _ in range(1000)]
+        self.assertEqual(run_ids, sorted(set(run_ids)))
+
+    def test_file_fingerprint(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'shard.csv')
+            with open(path, 'wb') as f:
+                f.write(b'a,b\n1,2\n')
+            fingerprint = file_fingerprint(path, block_size=3)
+        self.assertEqual(fingerprint, {'size': 8, 'sha256': hashlib.sha256(b'a,b\n1,2\n').hexdigest()})
+        self.assertEqual(file_fingerprint('https://example.com/sales.csv.gz'), {'size': None, 'sha256': None})
+
+    def test_verify_table_total(self):
+        manifest = RunManifest(20240101120000, 'config.ini')
+        manifest.add_batch('branch_sales', make_batch(1, 10, 9))
+        manifest.add_batch('branch_sales', make_batch(2, 5, 5))
+        manifest.add_batch('branch_sales', make_batch(3, 7, 7, loaded=False))
+        self.assertTrue(manifest.verify('branch_sales', {None: 14}))
+        self.assertFalse(manifest.verify('branch_sales', {None: 21}))
+
+    def test_verify_appended_table(self):
+        manifest = RunManifest(20240101120000, 'config.ini')
+        manifest.add_batch('branch_sales', make_batch(1, 10, 9))
+        self.assertTrue(manifest.verify('branch_sales', {None: 109}, rows_before=100))
+        self.assertFalse(manifest.verify('branch_sales', {None: 9}, rows_before=100))
+
+    def test_verify_per_batch_with_lineage(self):
+        manifest = RunManifest(20240101120000, 'config.ini', lineage_columns=True)
+        manifest.add_batch('branch_sales', make_batch(1, 10, 9))
+        manifest.add_batch('branch_sales', make_batch(2, 5, 5))
+        self.assertTrue(manifest.verify('branch_sales', {1: 9, 2: 5}))
+        self.assertFalse(manifest.verify('branch_sales', {1: 9}))
+        self.assertEqual(manifest.tables['branch_sales']['batches'][1]['db_rows'], 0)
+
+    def test_write_summarises_tables(self):
+        manifest = RunManifest(20240101120000, 'config.ini')
+        manifest.add_batch('branch_sales', make_batch(2, 5, 5))
+        manifest.add_batch('branch_sales', make_batch(1, 10, 9))
+        manifest.verify('branch_sales', {None: 14})
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = manifest.write(os.path.join(tmp_dir, 'manifests'), 'succeeded')
+            with open(path) as f:
+                written = json.load(f)
+
+        self.assertEqual(os.path.basename(path), '20240101120000.json')
+        table = written['tables']['branch_sales']
+        self.assertEqual((table['rows_in'], table['rows_out'], table['dropped_duplicates']), (15, 14, 1))
+        self.assertEqual(table['loaded_rows'], 14)
+        self.assertTrue(table['verified'])
+        self.assertEqual([batch['batch_id'] for batch in table['batches']], [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
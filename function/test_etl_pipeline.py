@@ -1,10 +1,20 @@
+import importlib.util
+import json
+import os
+import tempfile
+import threading
+import time
 import unittest
+from contextlib import contextmanager
 from unittest.mock import patch, MagicMock
 import pandas as pd
 from sqlalchemy import create_engine
 from io import StringIO
 import logging
-from etl_pipeline import auth, extract_data, transform_data, load_data_to_db
+from etl_inputs import write_compressed
+from etl_manifest import batch_checksum, file_fingerprint
+from etl_profiling import configure_profiling
+from etl_pipeline import auth, extract_data, transform_data, transform_table, load_data_to_db, process_shard, run_pipeline
 
 # Configure a separate logger for tests
 test_logger = logging.getLogger("etl_test_logger")
@@ -20,6 +30,12 @@ if test_logger.hasHandlers():
 
 test_logger.addHandler(file_handler)
 
+HAS_ZSTANDARD = importlib.util.find_spec('zstandard') is not None
+
+# Minimal database section for run_pipeline tests (the engine itself is patched)
+DB_CONFIG = "[postgresql]\nuser = u\npassword = p\nhost = localhost\nport = 5432\ndatabase = db\n\n"
+
+
 class TestETLPipeline(unittest.TestCase):
 
     def setUp(self):
@@ -65,6 +81,64 @@ class TestETLPipeline(unittest.TestCase):
         pd.testing.assert_frame_equal(df, self.branch_sales_data)
         test_logger.info("Test 'test_extract_data' passed.")
 
+    def test_extract_compressed_data(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            plain = os.path.join(tmp_dir, 'customers.csv')
+            self.customer_data.to_csv(plain, index=False)
+            expected = extract_data(plain)
+
+            for codec in ('gzip', 'bz2', 'zip'):
+                fixture = write_compressed(plain, tmp_dir, codec)
+                df = extract_data(fixture, columns=['email'])
+                pd.testing.assert_frame_equal(df, expected)
+
+                # The fingerprint is taken from the compressed bytes as they are read
+                fingerprint = {}
+                df = extract_data(fixture, fingerprint=fingerprint)
+                pd.testing.assert_frame_equal(df, expected)
+                self.assertEqual(fingerprint, file_fingerprint(fixture))
+        test_logger.info("Test 'test_extract_compressed_data' passed.")
+
+    def test_extract_timing_excludes_profiler_overhead(self):
+        @contextmanager
+        def slow_profile_stage(stage):
+            # Stands in for cProfile/tracemalloc set-up and reporting
+            time.sleep(0.2)
+            yield
+            time.sleep(0.2)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            plain = os.path.join(tmp_dir, 'customers.csv')
+            self.customer_data.to_csv(plain, index=False)
+            with patch('etl_pipeline.profile_stage', slow_profile_stage), \
+                    patch('etl_pipeline.record_extract') as mock_record:
+                extract_data(plain, fingerprint={})
+        path, codec, rows, wall_time, cpu_time = mock_record.call_args.args
+        self.assertEqual(rows, 2)
+        self.assertLess(wall_time, 0.2)
+        test_logger.info("Test 'test_extract_timing_excludes_profiler_overhead' passed.")
+
+    @unittest.skipUnless(HAS_ZSTANDARD, 'zstandard is not installed')
+    def test_extract_zstd_data(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            plain = os.path.join(tmp_dir, 'customers.csv')
+            self.customer_data.to_csv(plain, index=False)
+            expected = extract_data(plain)
+
+            fixture = write_compressed(plain, tmp_dir, 'zstd')
+            # Neither the codec nor the extension is given, only the magic bytes
+            renamed = os.path.join(tmp_dir, 'customers_export.csv')
+            os.rename(fixture, renamed)
+            df = extract_data(renamed, columns=['email'])
+            pd.testing.assert_frame_equal(df, expected)
+        test_logger.info("Test 'test_extract_zstd_data' passed.")
+
+    def test_batch_checksum_is_order_independent(self):
+        shuffled = self.customer_data.iloc[::-1].reset_index(drop=True)
+        self.assertEqual(batch_checksum(self.customer_data), batch_checksum(shuffled))
+        self.assertNotEqual(batch_checksum(self.customer_data), batch_checksum(self.customer_data.iloc[:1]))
+        test_logger.info("Test 'test_batch_checksum_is_order_independent' passed.")
+
     def test_transform_data(self):
         transformed = transform_data(
             self.branch_sales_data,
@@ -98,6 +172,224 @@ class TestETLPipeline(unittest.TestCase):
         mock_to_sql.assert_called_once_with('branch_sales', engine, if_exists='replace', index=False)
         test_logger.info("Test 'test_load_data_to_db' passed.")
 
+    def test_transform_table_unknown_transform(self):
+        with self.assertRaises(ValueError):
+            transform_table('no_such_table', self.customer_data)
+        test_logger.info("Test 'test_transform_table_unknown_transform' passed.")
+
+    @patch('etl_pipeline.verify_loaded_rows', return_value={None: 4})
+    @patch('etl_pipeline.load_data_to_db')
+    @patch('sqlalchemy.create_engine')
+    def test_run_pipeline_loads_glob_shards(self, mock_create_engine, mock_load, mock_verify):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for shard in range(2):
+                self.customer_data.to_csv(os.path.join(tmp_dir, f'customers_{shard}.csv'), index=False)
+            config_file = os.path.join(tmp_dir, 'config.ini')
+            with open(config_file, 'w') as f:
+                f.write(DB_CONFIG +
+                        "[source:customers]\npath = customers_*.csv\ntable = customer_data\n"
+                        "transform = customer_data\ncolumns = email, loyalty_status\n")
+            run_pipeline(config_file)
+
+            manifest_dir = os.path.join(tmp_dir, 'manifests')
+            with open(os.path.join(manifest_dir, os.listdir(manifest_dir)[0])) as f:
+                manifest = json.load(f)
+
+        # Both shards go to the same table: the first replaces it, the second appends
+        self.assertEqual(mock_load.call_count, 2)
+        self.assertEqual(sorted(call.kwargs['if_exists'] for call in mock_load.call_args_list), ['append', 'replace'])
+        self.assertTrue(all(call.args[1] == 'customer_data' for call in mock_load.call_args_list))
+
+        # The manifest records one batch per shard and the verified row counts
+        self.assertEqual(manifest['status'], 'succeeded')
+        table = manifest['tables']['customer_data']
+        self.assertEqual([batch['batch_id'] for batch in table['batches']], [1, 2])
+        self.assertEqual(table['loaded_rows'], 4)
+        self.assertTrue(table['verified'])
+        self.assertEqual(table['batches'][0]['checksum'], table['batches'][1]['checksum'])
+        test_logger.info("Test 'test_run_pipeline_loads_glob_shards' passed.")
+
+    def test_run_pipeline_sources_sharing_a_table(self):
+        # Two feeds load into one table on separate runs; neither run may wipe the other's rows
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.customer_data.to_csv(os.path.join(tmp_dir, 'customers_south.csv'), index=False)
+            pd.DataFrame({
+                'email': ['north@example.com', 'NORTH2@EXAMPLE.COM', 'north3@example.com'],
+                'loyalty_status': ['Gold', None, 'Silver']
+            }).to_csv(os.path.join(tmp_dir, 'customers_north.csv'), index=False)
+
+            config_file = os.path.join(tmp_dir, 'config.ini')
+            with open(config_file, 'w') as f:
+                f.write(DB_CONFIG +
+                        "[source:customers_south]\npath = customers_south.csv\ntable = customer_data\n"
+                        "transform = customer_data\n\n"
+                        "[source:customers_north]\npath = customers_north.csv\ntable = customer_data\n"
+                        "transform = customer_data\nschedule = 06:00\n")
+
+            engine = create_engine(f"sqlite:///{os.path.join(tmp_dir, 'etl.db')}")
+            with patch('sqlalchemy.create_engine', return_value=engine):
+                run_pipeline(config_file, ['customers_south'])
+                run_pipeline(config_file, ['customers_north'])
+                self.assertEqual(pd.read_sql('SELECT * FROM customer_data', engine).shape[0], 5)
+
+                # Running a source again replaces its own rows instead of adding them twice
+                run_pipeline(config_file, ['customers_north'])
+                run_pipeline(config_file, ['customers_north'])
+                counts = pd.read_sql('SELECT source, COUNT(*) AS n FROM customer_data GROUP BY source '
+                                     'ORDER BY source', engine)
+                self.assertEqual(counts.values.tolist(), [['customers_north', 3], ['customers_south', 2]])
+
+                # A run covering every source of the table replaces it
+                run_pipeline(config_file)
+                self.assertEqual(pd.read_sql('SELECT * FROM customer_data', engine).shape[0], 5)
+            engine.dispose()
+
+            manifest_dir = os.path.join(tmp_dir, 'manifests')
+            for name in os.listdir(manifest_dir):
+                with open(os.path.join(manifest_dir, name)) as f:
+                    self.assertTrue(json.load(f)['tables']['customer_data']['verified'])
+        test_logger.info("Test 'test_run_pipeline_sources_sharing_a_table' passed.")
+
+    @patch('sqlalchemy.create_engine')
+    def test_run_pipeline_writes_manifest_when_setup_fails(self, mock_create_engine):
+        mock_create_engine.side_effect = RuntimeError('could not connect to server')
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.customer_data.to_csv(os.path.join(tmp_dir, 'customers.csv'), index=False)
+            config_file = os.path.join(tmp_dir, 'config.ini')
+            with open(config_file, 'w') as f:
+                f.write(DB_CONFIG +
+                        "[source:customers]\npath = customers.csv\ntable = customer_data\n"
+                        "transform = customer_data\n")
+            with self.assertRaises(RuntimeError):
+                run_pipeline(config_file)
+
+            manifest_dir = os.path.join(tmp_dir, 'manifests')
+            with open(os.path.join(manifest_dir, os.listdir(manifest_dir)[0])) as f:
+                manifest = json.load(f)
+        self.assertEqual(manifest['status'], 'failed')
+        self.assertEqual(manifest['error'], 'could not connect to server')
+        test_logger.info("Test 'test_run_pipeline_writes_manifest_when_setup_fails' passed.")
+
+    def test_run_pipeline_with_lineage_columns(self):
+        # Every loaded row carries its run and batch, and the manifest is verified per batch
+        from sqlalchemy import inspect, text
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for shard, size in ((1, 2), (2, 3)):
+                pd.DataFrame({
+                    'email': [f'USER{shard}_{i}@EXAMPLE.COM' for i in range(size)],
+                    'loyalty_status': ['Gold'] + [None] * (size - 1)
+                }).to_csv(os.path.join(tmp_dir, f'customers_{shard}.csv'), index=False)
+            config_file = os.path.join(tmp_dir, 'config.ini')
+            with open(config_file, 'w') as f:
+                f.write(DB_CONFIG + "[pipeline]\nlineage_columns = true\n\n"
+                        "[source:customers]\npath = customers_*.csv\ntable = customer_data\n"
+                        "transform = customer_data\n")
+
+            engine = create_engine(f"sqlite:///{os.path.join(tmp_dir, 'etl.db')}")
+            try:
+                with patch('sqlalchemy.create_engine', return_value=engine):
+                    run_pipeline(config_file)
+                manifest_dir = os.path.join(tmp_dir, 'manifests')
+                with open(os.path.join(manifest_dir, os.listdir(manifest_dir)[0])) as f:
+                    manifest = json.load(f)
+
+                table = manifest['tables']['customer_data']
+                self.assertTrue(manifest['lineage_columns'])
+                self.assertEqual(manifest['status'], 'succeeded')
+                self.assertTrue(table['verified'])
+                self.assertEqual(table['db_rows'], 5)
+                self.assertEqual([(batch['batch_id'], batch['rows_out'], batch['db_rows'])
+                                  for batch in table['batches']], [(1, 2, 2), (2, 3, 3)])
+
+                index_names = [index['name'] for index in inspect(engine).get_indexes('customer_data')]
+                self.assertIn('ix_customer_data_lineage', index_names)
+
+                counts = pd.read_sql('SELECT run_id, batch_id, COUNT(*) AS n FROM customer_data '
+                                     'GROUP BY run_id, batch_id ORDER BY batch_id', engine)
+                self.assertEqual(counts['run_id'].tolist(), [manifest['run_id']] * 2)
+                self.assertEqual(counts['n'].tolist(), [2, 3])
+
+                # A single batch can be rolled back by its lineage columns
+                with engine.begin() as conn:
+                    conn.execute(text('DELETE FROM customer_data WHERE run_id = :run_id AND batch_id = 2'),
+                                 {'run_id': manifest['run_id']})
+                self.assertEqual(pd.read_sql('SELECT * FROM customer_data', engine).shape[0], 2)
+            finally:
+                engine.dispose()
+        test_logger.info("Test 'test_run_pipeline_with_lineage_columns' passed.")
+
+    def test_run_pipeline_switches_on_lineage_for_existing_table(self):
+        # A partial run with lineage appends to a table created before lineage was switched on
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for feed in ('south', 'north'):
+                self.customer_data.assign(email=[f'{feed}1@example.com', f'{feed}2@example.com']).to_csv(
+                    os.path.join(tmp_dir, f'customers_{feed}.csv'), index=False)
+            sources = ("[source:customers_south]\npath = customers_south.csv\ntable = customer_data\n"
+                       "transform = customer_data\n\n"
+                       "[source:customers_north]\npath = customers_north.csv\ntable = customer_data\n"
+                       "transform = customer_data\n")
+            config_file = os.path.join(tmp_dir, 'config.ini')
+            engine = create_engine(f"sqlite:///{os.path.join(tmp_dir, 'etl.db')}")
+            try:
+                with patch('sqlalchemy.create_engine', return_value=engine):
+                    with open(config_file, 'w') as f:
+                        f.write(DB_CONFIG + sources)
+                    run_pipeline(config_file)
+
+                    with open(config_file, 'w') as f:
+                        f.write(DB_CONFIG + "[pipeline]\nlineage_columns = true\n\n" + sources)
+                    run_pipeline(config_file, ['customers_north'])
+
+                rows = pd.read_sql('SELECT source, run_id, batch_id FROM customer_data ORDER BY source', engine)
+            finally:
+                engine.dispose()
+        self.assertEqual(rows['source'].tolist(), ['customers_north'] * 2 + ['customers_south'] * 2)
+        self.assertEqual(rows['batch_id'].tolist()[:2], [1, 1])
+        self.assertTrue(rows['run_id'].iloc[2:].isna().all())
+        test_logger.info("Test 'test_run_pipeline_switches_on_lineage_for_existing_table' passed.")
+
+    def test_run_pipeline_profiles_shards_sequentially(self):
+        # Profiling hooks are not thread-safe, so every stage must run on the calling thread
+        threads = []
+
+        def record_thread(*args, **kwargs):
+            threads.append(threading.current_thread())
+            return process_shard(*args, **kwargs)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for shard in range(3):
+                self.customer_data.to_csv(os.path.join(tmp_dir, f'customers_{shard}.csv'), index=False)
+            config_file = os.path.join(tmp_dir, 'config.ini')
+            with open(config_file, 'w') as f:
+                f.write(DB_CONFIG + "[pipeline]\nmax_workers = 4\n\n"
+                        f"[profiling]\nenabled = cprofile,tracemalloc\noutput_dir = {tmp_dir}/profiles\n\n"
+                        "[source:customers]\npath = customers_*.csv\ntable = customer_data\n"
+                        "transform = customer_data\n")
+
+            engine = create_engine(f"sqlite:///{os.path.join(tmp_dir, 'etl.db')}")
+            try:
+                with patch.dict(os.environ, {}, clear=True), \
+                        patch('sqlalchemy.create_engine', return_value=engine), \
+                        patch('etl_pipeline.process_shard', side_effect=record_thread):
+                    run_pipeline(config_file)
+                profile_dir = os.path.join(tmp_dir, 'profiles')
+                artifacts = os.listdir(os.path.join(profile_dir, os.listdir(profile_dir)[0]))
+            finally:
+                with patch.dict(os.environ, {}, clear=True):
+                    configure_profiling()
+                engine.dispose()
+
+        self.assertEqual(threads, [threading.main_thread()] * 3)
+
+        # Every shard keeps its own profile artifacts
+        self.assertEqual(sorted(name for name in artifacts if name.endswith('.prof')), sorted(
+            f'{stage}.customers.{batch_id}.prof'
+            for batch_id in (1, 2, 3)
+            for stage in ('extract', 'load.customer_data', 'transform.customer_data')
+        ))
+        test_logger.info("Test 'test_run_pipeline_profiles_shards_sequentially' passed.")
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,90 @@
+import os
+import tempfile
+import tracemalloc
+import unittest
+from unittest.mock import patch
+import etl_profiling
+from etl_profiling import configure_profiling, begin_run, profile_stage, profiling_enabled
+
+
+class TestETLProfiling(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.config_file = os.path.join(self.tmp_dir.name, 'config.ini')
+        with open(self.config_file, 'w') as f:
+            f.write("[profiling]\nenabled = cprofile,tracemalloc\ntop_n = 5\n"
+                    f"output_dir = {os.path.join(self.tmp_dir.name, 'profiles')}\n")
+
+    def tearDown(self):
+        # Leave profiling switched off for other tests
+        with patch.dict(os.environ, {}, clear=True):
+            configure_profiling()
+        etl_profiling._run_dir = None
+        self.tmp_dir.cleanup()
+
+    def test_disabled_by_default(self):
+        with patch.dict(os.environ, {}, clear=True):
+            configure_profiling()
+        self.assertFalse(profiling_enabled())
+        self.assertIsNone(begin_run())
+        with profile_stage('extract.test'):
+            pass
+
+    def test_config_enables_profiling(self):
+        with patch.dict(os.environ, {}, clear=True):
+            settings = configure_profiling(self.config_file)
+        self.assertEqual(settings['modes'], ('cprofile', 'tracemalloc'))
+        self.assertEqual(settings['top_n'], 5)
+
+    def test_output_dir_is_relative_to_config(self):
+        with open(self.config_file, 'w') as f:
+            f.write("[profiling]\nenabled = cprofile\noutput_dir = profiles\n")
+        with patch.dict(os.environ, {}, clear=True):
+            settings = configure_profiling(self.config_file)
+        self.assertEqual(settings['output_dir'], os.path.join(self.tmp_dir.name, 'profiles'))
+
+    def test_environment_overrides_config(self):
+        with patch.dict(os.environ, {'ETL_PROFILE': 'off'}, clear=True):
+            configure_profiling(self.config_file)
+        self.assertFalse(profiling_enabled())
+
+    def test_unknown_mode_raises(self):
+        with patch.dict(os.environ, {'ETL_PROFILE': 'perf'}, clear=True):
+            with self.assertRaises(ValueError):
+                configure_profiling()
+
+    def test_stage_writes_artifacts(self):
+        with patch.dict(os.environ, {}, clear=True):
+            configure_profiling(self.config_file)
+        run_dir = begin_run('test_run')
+
+        with self.assertLogs(level='INFO') as logs:
+            with profile_stage('transform.branch_sales'):
+                sorted(str(i) for i in range(10000))
+
+        self.assertTrue(os.path.exists(os.path.join(run_dir, 'transform.branch_sales.prof')))
+        self.assertTrue(os.path.exists(os.path.join(run_dir, 'transform.branch_sales.tracemalloc.txt')))
+        self.assertTrue(any('hotspots' in line for line in logs.output))
+
+    @unittest.skipUnless(hasattr(tracemalloc, 'reset_peak'), 'tracemalloc.reset_peak needs Python 3.9+')
+    def test_stage_peak_is_per_stage(self):
+        with patch.dict(os.environ, {'ETL_PROFILE': 'tracemalloc'}, clear=True):
+            configure_profiling(self.config_file)
+        begin_run('test_run')
+
+        tracemalloc.start()
+        try:
+            large = bytearray(50_000_000)
+            del large
+            with self.assertLogs(level='INFO') as logs:
+                with profile_stage('load.customer_data'):
+                    sorted(range(1000))
+        finally:
+            tracemalloc.stop()
+        peak = next(line for line in logs.output if 'peak=' in line).split('peak=')[1].split('MB')[0]
+        self.assertLess(float(peak), 50)
+
+
+if __name__ == '__main__':
+    unittest.main()